@@ -3,58 +3,215 @@
 
 """
 Crawler que rastrea todas las subpáginas de un mismo dominio sin límite de profundidad.
-- No aplica timeout (para evitar cortes prematuros).
+- Timeout holgado (5 s de conexión, 30 s de lectura) para evitar cortes prematuros.
 - Filtra subpáginas al mismo dominio, ignorando 'www.' y fragmentos (#).
 - Registra y guarda enlaces con sus códigos de estado en un CSV con el nombre: dominio.csv
 - Evita re-visitar URLs ya exploradas.
 - Puede leer archivos locales (file://), aunque suele usarse para http/https.
+- Modo asíncrono opcional (--async) con asyncio + aiohttp en lugar de hilos.
 
 Uso:
     python crawler_infinito.py https://ejemplo.com --workers 20 --same_domain
 """
 
 import logging
+from logging.handlers import QueueHandler, QueueListener
 import csv
+import re
+import functools
+import os
+import socket
 import time
 import sys
+import threading
 import requests
-from queue import Queue
-from urllib.parse import urlparse, urljoin, urlunparse, ParseResult
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+from queue import SimpleQueue
+from collections import deque
+from urllib.parse import urlparse, urljoin
+from bs4 import BeautifulSoup, SoupStrainer
+from selectolax.lexbor import LexborHTMLParser
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import aiohttp
+except ImportError:  # Solo necesario para el modo asíncrono (--async)
+    aiohttp = None
+
+try:
+    from pybloom_live import ScalableBloomFilter
+except ImportError:  # Solo necesario para --bloom
+    ScalableBloomFilter = None
 import argparse
+import asyncio
+from typing import Tuple
+
+# Timeout (conexión, lectura) para cada petición HTTP
+TIMEOUT = (5, 30)
+
+# Cabeceras enviadas en todas las peticiones (se fijan una vez en la sesión)
+_DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/98.0.4758.102 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml"
+}
+
+# Tipos MIME que se parsean en busca de enlaces
+_HTML_TYPES = ("text/html", "application/xhtml")
+
+# Tamaño máximo del cuerpo HTML que se descarga por página (4 MiB)
+MAX_HTML_BYTES = 4 * 1024 * 1024
+
+# Extensiones que nunca contienen enlaces: basta con un HEAD para conocer su estado
+BINARY_EXTENSIONS = frozenset({
+    ".pdf", ".zip", ".png", ".jpg", ".jpeg", ".gif", ".mp4",
+    ".woff", ".woff2", ".ico", ".svg", ".css", ".js"
+})
+
+# Limita el parseo de BeautifulSoup a las etiquetas <a> con href
+_A_STRAINER = SoupStrainer("a", href=True)
+
+# urlparse/urljoin son parsers en Python puro: se memorizan para no repetir
+# el trabajo con las mismas URLs (p. ej. enlaces de navegación comunes)
+_urlparse_cached = functools.lru_cache(maxsize=65536)(urlparse)
+_urljoin_cached = functools.lru_cache(maxsize=65536)(urljoin)
+
+# <meta charset="..."> o <meta http-equiv="Content-Type" content="...; charset=...">
+_META_CHARSET_RE = re.compile(
+    rb"<meta\b[^>]*?charset\s*=\s*[\"']?\s*([\w.:-]+)",
+    re.IGNORECASE
+)
+
+
+def _fast_split(url: str) -> Tuple[str, str, str]:
+    """
+    Divide una URL http(s) en (esquema, netloc, resto) con str.partition, mucho
+    más rápido que urlparse. El netloc se devuelve en minúsculas y sin 'www.';
+    el resto conserva ruta, query y fragmento.
+    Devuelve ("", "", "") si la URL necesita el urlparse completo
+    (file://, otros esquemas, usuario@, IPv6, caracteres de control...).
+    """
+    scheme, sep, rest = url.partition("://")
+    if not sep or scheme not in ("http", "https") or not url.isprintable() or url.endswith(" "):
+        return "", "", ""
+
+    # El netloc termina en el primer '/', '?' o '#'
+    end = len(rest)
+    for delim in "/?#":
+        i = rest.find(delim, 0, end)
+        if i != -1:
+            end = i
+    netloc, rest = rest[:end], rest[end:]
+    if not netloc.isascii() or "@" in netloc or "[" in netloc or "]" in netloc:
+        return "", "", ""
+
+    netloc = netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    if not netloc:
+        return "", "", ""
+    return scheme, netloc, rest
 
 
-def canonicalize_url(url: str) -> str:
+@functools.lru_cache(maxsize=131072)
+def _canonicalize_with_netloc(url: str) -> Tuple[str, str]:
     """
-    Elimina 'www.', el fragment (#), y normaliza la URL para evitar duplicados.
-    Ejemplo:
-      https://www.ejemplo.com/sobre-nosotros/#section 
-        => https://ejemplo.com/sobre-nosotros
+    Normaliza la URL (ver canonicalize_url) y devuelve también su dominio,
+    reutilizando el mismo análisis: (url_canonica, netloc).
     """
-    parsed = urlparse(url)
+    # Caso habitual http(s): dividir a mano y ensamblar sin fragmento
+    scheme, netloc, rest = _fast_split(url)
+    if scheme:
+        path, _, query = rest.partition("#")[0].partition("?")
+        # Las rutas con ';params' se dejan al camino general (urlparse los separa)
+        if ";" not in path:
+            canon = f"{scheme}://{netloc}{path}"
+            if query:
+                canon += f"?{query}"
+            return canon.rstrip("/"), netloc
+
+    parsed = _urlparse_cached(url)
     
     # Quitar 'www.' del netloc
     netloc = parsed.netloc.lower()
     if netloc.startswith("www."):
         netloc = netloc[4:]
     
-    # Eliminar fragmento (#...)
-    new_fragment = ""
-    
-    # Reconstruir la URL sin fragment
-    new_parsed = ParseResult(
-        scheme=parsed.scheme,
-        netloc=netloc,
-        path=parsed.path,
-        params=parsed.params,
-        query=parsed.query,
-        fragment=new_fragment
-    )
-    canon = urlunparse(new_parsed)
+    # Reconstruir la URL sin fragmento (#...)
+    if parsed.scheme in ("http", "https") and netloc and not parsed.params:
+        # Caso habitual: ensamblar directamente, sin pasar por urlunparse
+        canon = f"{parsed.scheme}://{netloc}{parsed.path}"
+        if parsed.query:
+            canon += f"?{parsed.query}"
+    else:
+        canon = parsed._replace(netloc=netloc, fragment="").geturl()
     
     # Quitar barra final si existe
-    return canon.rstrip("/")
+    return canon.rstrip("/"), netloc
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Elimina 'www.', el fragment (#), y normaliza la URL para evitar duplicados.
+    Ejemplo:
+      https://www.ejemplo.com/sobre-nosotros/#section 
+        => https://ejemplo.com/sobre-nosotros
+    """
+    return _canonicalize_with_netloc(url)[0]
+
+
+def _is_binary_path(path: str) -> bool:
+    """
+    Devuelve True si la ruta termina en una extensión de BINARY_EXTENSIONS.
+    """
+    return os.path.splitext(path)[1].lower() in BINARY_EXTENSIONS
+
+
+def _decode_html(html_bytes: bytes, encoding) -> str:
+    """
+    Decodifica el cuerpo HTML con la codificación declarada. Sin declaración
+    (o si no se reconoce) prueba UTF-8 y, si no es válido, ISO-8859-1.
+    """
+    if encoding:
+        try:
+            return html_bytes.decode(encoding, "replace")
+        except LookupError:
+            pass
+    try:
+        return html_bytes.decode("utf-8")
+    except UnicodeDecodeError:
+        return html_bytes.decode("iso-8859-1")
+
+
+def _is_html(content_type: str) -> bool:
+    """
+    Devuelve True si la cabecera Content-Type corresponde a HTML/XHTML.
+    """
+    return content_type.split(";", 1)[0].strip().lower().startswith(_HTML_TYPES)
+
+
+def _declared_charset(content_type: str):
+    """
+    Devuelve el charset declarado en la cabecera Content-Type, o None.
+    """
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset":
+            return value.strip().strip("\"'") or None
+    return None
+
+
+def _meta_charset(html_bytes: bytes):
+    """
+    Devuelve el charset declarado con <meta> al inicio del documento, o None.
+    """
+    match = _META_CHARSET_RE.search(html_bytes, 0, 4096)
+    return match.group(1).decode("ascii") if match else None
 
 
 class Crawler:
@@ -67,201 +224,523 @@ class Crawler:
         self,
         start_url: str,
         same_domain: bool = True,
-        max_workers: int = 10
+        max_workers: int = 10,
+        use_async: bool = False,
+        use_bloom: bool = False,
+        quiet: bool = False
     ):
         """
         Parámetros principales:
         -----------------------
         - start_url: URL inicial (http/https o file://...).
         - same_domain: Solo seguir enlaces del mismo dominio (ignorando 'www.').
-        - max_workers: Nº de hilos para procesar en paralelo.
+        - max_workers: Nº de hilos (o de tareas asíncronas) para procesar en paralelo.
+        - use_async: Usar asyncio + aiohttp en lugar de hilos.
+        - use_bloom: Guardar las URLs visitadas en un filtro de Bloom (memoria acotada,
+          a costa de omitir muy rara vez una página por falso positivo).
+        - quiet: Registrar solo avisos y errores, y únicamente en crawler.log.
         """
         # Normaliza la URL inicial
         self.start_url = canonicalize_url(start_url)
         self.same_domain = same_domain
         self.max_workers = max_workers
+        self.use_async = use_async
+        if use_async and aiohttp is None:
+            raise RuntimeError("El modo asíncrono requiere aiohttp (pip install aiohttp).")
 
         # Determina el dominio base (sin 'www.')
-        parsed = urlparse(self.start_url)
+        parsed = _urlparse_cached(self.start_url)
         self.base_domain = parsed.netloc  # ej.: ejemplo.com
 
         # El CSV tendrá el nombre del dominio base
         self.csv_output = f"{self.base_domain}.csv"
 
         # Estructuras de datos
-        self.visited = set()
-        self.queue = Queue()
-        self.queue.put(self.start_url)  # Encolamos la URL inicial
-        self.all_links = []  # Lista para almacenar (URL, Código de Estado)
-
-        # Configura logs
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s [%(levelname)s] %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-            handlers=[
-                logging.StreamHandler(sys.stdout),
-                logging.FileHandler("crawler.log", "a", encoding="utf-8")
-            ]
+        if use_bloom:
+            if ScalableBloomFilter is None:
+                raise RuntimeError("La opción --bloom requiere pybloom-live (pip install pybloom-live).")
+            self.visited = ScalableBloomFilter(
+                initial_capacity=100_000,
+                error_rate=1e-6,
+                mode=ScalableBloomFilter.LARGE_SET_GROWTH
+            )
+        else:
+            self.visited = set()
+        self.queue = deque([self.start_url])  # URLs iniciales pendientes de enviar
+        # Cola de (URL, Código de Estado) que un hilo escritor vuelca al CSV
+        # durante el rastreo, sin acumular los resultados en memoria
+        self.results = SimpleQueue()
+        self.links_written = 0
+
+        # Despacho continuo: cada tarea envía sus subenlaces directamente al
+        # pool y 'done' se activa cuando no queda ninguna tarea en curso
+        self.executor = None
+        self.visited_lock = threading.Lock()
+        self.inflight = 0
+        self.done = threading.Event()
+        self.stopping = False  # True al interrumpirse el rastreo: no se envían más URLs
+
+        # Configura logs: los workers solo encolan los registros y un hilo
+        # (QueueListener) se encarga de formatearlos y escribirlos
+        formatter = logging.Formatter(
+            "%(asctime)s [%(levelname)s] %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S"
         )
+        handlers = [logging.FileHandler("crawler.log", "a", encoding="utf-8", delay=True)]
+        if not quiet:
+            handlers.append(logging.StreamHandler(sys.stdout))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = SimpleQueue()
+        self.log_listener = QueueListener(log_queue, *handlers)
         self.logger = logging.getLogger(__name__)
 
-    def _is_same_domain(self, url: str) -> bool:
-        """
-        Devuelve True si la URL dada pertenece al mismo dominio base.
-        """
-        canon = canonicalize_url(url)
-        parsed = urlparse(canon)
-        return parsed.netloc == self.base_domain
+        # El QueueHandler se instala en el logger del crawler (y en el de urllib3,
+        # para conservar los avisos de reintentos), sustituyendo el de un Crawler
+        # anterior del mismo proceso en lugar de depender de logging.basicConfig
+        queue_handler = QueueHandler(log_queue)
+        for logger in (self.logger, logging.getLogger("urllib3")):
+            for old_handler in [h for h in logger.handlers if isinstance(h, QueueHandler)]:
+                logger.removeHandler(old_handler)
+            logger.addHandler(queue_handler)
+            logger.setLevel(logging.WARNING if quiet else logging.INFO)
+            logger.propagate = False
+
+        # Sesión HTTP compartida entre hilos: reutiliza conexiones keep-alive
+        # en lugar de repetir el handshake TCP+TLS en cada URL
+        self.session = requests.Session()
+        self.session.headers.update(_DEFAULT_HEADERS)
+        adapter = HTTPAdapter(
+            pool_connections=max_workers,
+            pool_maxsize=max_workers * 2,
+            max_retries=Retry(total=2, backoff_factor=0.1)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
-    def _parse_links(self, html_text: str, current_url: str) -> list:
+    def _parse_links(self, html_bytes: bytes, current_url: str, charset=None) -> list:
         """
         Extrae y normaliza todas las URLs encontradas en <a href="...">.
+        Devuelve una lista de tuplas (url_canonica, netloc).
         """
-        soup = BeautifulSoup(html_text, "html.parser")
+        # Sin charset en la cabecera, usar el declarado con <meta>
+        if not charset:
+            charset = _meta_charset(html_bytes)
+        html_text = _decode_html(html_bytes, charset)
+
+        try:
+            # selectolax (parser en C) es mucho más rápido que BeautifulSoup
+            tree = LexborHTMLParser(html_text)
+            hrefs = [node.attributes.get("href") for node in tree.css("a[href]")]
+        except Exception:
+            # HTML malformado: recurrir a BeautifulSoup
+            soup = BeautifulSoup(html_text, "lxml", parse_only=_A_STRAINER)
+            hrefs = [tag["href"] for tag in soup.find_all("a")]
+
         found_links = []
-        
-        for tag in soup.find_all("a"):
-            href = tag.get("href")
+        for href in hrefs:
             if href:
-                abs_url = urljoin(current_url, href.strip())
-                canon = canonicalize_url(abs_url)
-                found_links.append(canon)
+                abs_url = _urljoin_cached(current_url, href.strip())
+                found_links.append(_canonicalize_with_netloc(abs_url))
         return found_links
 
+    @staticmethod
+    def _redirect_chain(url: str, history: list, status_code: int, final_url) -> str:
+        """
+        Describe la posible cadena de redirecciones de una respuesta.
+        'history' es una lista de tuplas (código, URL) con los saltos previos.
+        """
+        if history:
+            return " -> ".join(
+                f"[{code}]{hop}" for code, hop in history
+            ) + f" -> [{status_code}]{final_url}"
+        return f"{url} => [{status_code}] (sin redirecciones)"
+
+    def _read_local(self, url: str, path: str):
+        """
+        Lee un archivo local (file://) y registra su estado.
+        Devuelve el contenido leído (bytes), o None si no se pudo abrir.
+        """
+        try:
+            path_local = path.lstrip("/")
+            with open(path_local, "rb") as f:
+                html_bytes = f.read()
+            self.logger.info("[LOCAL] %s => 200 OK", url)
+            # Registrar el resultado
+            self._record(url, 200)
+            return html_bytes
+        except Exception as e:
+            self.logger.error("[LOCAL] Error abriendo %s: %s", url, e)
+            # Registrar el error con un código de estado específico, por ejemplo, 0
+            self._record(url, 0)
+            return None
+
+    def _new_links(self, html_bytes: bytes, url: str, charset=None) -> list:
+        """
+        Parsea los subenlaces del HTML y devuelve los que quedan por visitar
+        (ya marcados como visitados), aplicando el filtro de dominio.
+        """
+        sublinks = self._parse_links(html_bytes, url, charset)
+        self.logger.info("Se encontraron %d enlaces en %s", len(sublinks), url)
+
+        new_links = []
+        for link, netloc in sublinks:
+            # Filtrar dominio si same_domain==True
+            if self.same_domain and netloc != self.base_domain:
+                continue
+
+            # Evitar re-visitas
+            if self._mark_if_new(link):
+                new_links.append(link)
+        return new_links
+
     def _visit_url(self, url: str):
         """
         Visita la URL (file:// o HTTP/HTTPS), registra el código HTTP,
         parsea enlaces si es HTML y encola nuevos links si cumplen el filtro de dominio.
         No aplica límite de profundidad.
         """
-        parsed = urlparse(url)
+        parsed = _urlparse_cached(url)
 
         # --- Caso file:// ---
         if parsed.scheme == "file":
-            try:
-                path_local = parsed.path.lstrip("/")
-                with open(path_local, "r", encoding="utf-8") as f:
-                    html_text = f.read()
-                status_code = 200
-                content_type = "text/html"
-                self.logger.info(f"[LOCAL] {url} => 200 OK")
-                # Registrar en all_links
-                self.all_links.append((url, status_code))
-            except Exception as e:
-                self.logger.error(f"[LOCAL] Error abriendo {url}: {e}")
-                # Registrar el error con un código de estado específico, por ejemplo, 0
-                self.all_links.append((url, 0))
+            html_bytes = self._read_local(url, parsed.path)
+            if html_bytes is None:
                 return
+            content_type = "text/html"
+            is_html = True
 
         else:
             # --- Caso HTTP/HTTPS ---
-            headers = {
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/98.0.4758.102 Safari/537.36"
-                )
-            }
             try:
-                # Sin timeout => timeout=None
-                resp = requests.get(url, headers=headers, timeout=None, allow_redirects=True)
-                status_code = resp.status_code
-                content_type = resp.headers.get("Content-Type", "")
-                html_text = resp.text
-                
-                # Mostrar posible cadena de redirecciones
-                if resp.history:
-                    chain_info = " -> ".join(
-                        f"[{r.status_code}]{r.url}" for r in resp.history
-                    ) + f" -> [{status_code}]{resp.url}"
-                else:
-                    chain_info = f"{url} => [{status_code}] (sin redirecciones)"
-
-                self.logger.info(f"[HTTP] {chain_info}, {len(html_text)} bytes")
-
-                # Registrar en all_links
-                self.all_links.append((url, status_code))
-
-            except requests.exceptions.RequestException as e:
-                self.logger.error(f"[HTTP] Excepción con {url}: {e}")
+                # Recursos binarios: comprobar el estado con HEAD, sin descargar el cuerpo
+                # (si el servidor no admite HEAD, se recurre al GET habitual)
+                if _is_binary_path(parsed.path):
+                    resp = self.session.head(url, timeout=TIMEOUT, allow_redirects=True)
+                    if resp.status_code not in (405, 501):
+                        if self.logger.isEnabledFor(logging.INFO):
+                            chain_info = self._redirect_chain(
+                                url, [(r.status_code, r.url) for r in resp.history],
+                                resp.status_code, resp.url
+                            )
+                            self.logger.info("[HEAD] %s", chain_info)
+                        self._record(url, resp.status_code)
+                        return
+
+                resp = self.session.get(
+                    url, timeout=TIMEOUT, allow_redirects=True, stream=True
+                )
+                try:
+                    status_code = resp.status_code
+                    content_type = resp.headers.get("Content-Type", "")
+                    is_html = _is_html(content_type)
+
+                    # Solo se descarga el cuerpo si es HTML, y como mucho MAX_HTML_BYTES
+                    if is_html:
+                        html_bytes = resp.raw.read(MAX_HTML_BYTES, decode_content=True)
+                    else:
+                        html_bytes = b""
+                finally:
+                    resp.close()
+
+                if self.logger.isEnabledFor(logging.INFO):
+                    chain_info = self._redirect_chain(
+                        url, [(r.status_code, r.url) for r in resp.history],
+                        status_code, resp.url
+                    )
+                    self.logger.info("[HTTP] %s, %d bytes", chain_info, len(html_bytes))
+
+                # Registrar el resultado
+                self._record(url, status_code)
+
+            except (requests.exceptions.RequestException, Urllib3HTTPError) as e:
+                self.logger.error("[HTTP] Excepción con %s: %s", url, e)
                 # Registrar el error con un código de estado específico, por ejemplo, 0
-                self.all_links.append((url, 0))
+                self._record(url, 0)
                 return
 
         # --- Si es HTML, parsear subenlaces ---
-        if "text/html" in content_type.lower():
-            sublinks = self._parse_links(html_text, url)
-            self.logger.info(f"Se encontraron {len(sublinks)} enlaces en {url}")
-
-            for link in sublinks:
-                # Filtrar dominio si same_domain==True
-                if self.same_domain and not self._is_same_domain(link):
-                    continue
+        if is_html:
+            for link in self._new_links(html_bytes, url, _declared_charset(content_type)):
+                self._submit(link)
 
-                # Evitar re-visitas
-                if link not in self.visited:
-                    self.queue.put(link)
-
-    def run(self):
+    async def _fetch(self, session, queue, url: str):
         """
-        Ejecuta el crawler, procesando hasta que no queden URLs nuevas en la cola.
+        Versión asíncrona (aiohttp) de _visit_url: los subenlaces nuevos se
+        añaden a la cola asyncio en lugar de enviarse al thread pool.
         """
-        self.logger.info("========== INICIANDO RASTREO ==========")
-        inicio = time.time()
+        parsed = _urlparse_cached(url)
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            while True:
-                futures = []
+        # --- Caso file:// ---
+        if parsed.scheme == "file":
+            html_bytes = self._read_local(url, parsed.path)
+            if html_bytes is None:
+                return
+            content_type = "text/html"
+            is_html = True
 
-                # Vaciar la cola actual en un lote de URLs a procesar
-                while not self.queue.empty():
-                    current_url = self.queue.get()
+        else:
+            # --- Caso HTTP/HTTPS ---
+            try:
+                if _is_binary_path(parsed.path):
+                    async with session.head(url, allow_redirects=True) as resp:
+                        if resp.status not in (405, 501):
+                            if self.logger.isEnabledFor(logging.INFO):
+                                chain_info = self._redirect_chain(
+                                    url, [(r.status, r.url) for r in resp.history],
+                                    resp.status, resp.url
+                                )
+                                self.logger.info("[HEAD] %s", chain_info)
+                            self._record(url, resp.status)
+                            return
+
+                async with session.get(url, allow_redirects=True) as resp:
+                    status_code = resp.status
+                    content_type = resp.headers.get("Content-Type", "")
+                    is_html = _is_html(content_type)
+
+                    # Solo se descarga el cuerpo si es HTML, y como mucho MAX_HTML_BYTES
+                    if is_html:
+                        try:
+                            html_bytes = await resp.content.readexactly(MAX_HTML_BYTES)
+                        except asyncio.IncompleteReadError as e:
+                            html_bytes = e.partial
+                    else:
+                        html_bytes = b""
+
+                if self.logger.isEnabledFor(logging.INFO):
+                    chain_info = self._redirect_chain(
+                        url, [(r.status, r.url) for r in resp.history],
+                        status_code, resp.url
+                    )
+                    self.logger.info("[HTTP] %s, %d bytes", chain_info, len(html_bytes))
+
+                # Registrar el resultado
+                self._record(url, status_code)
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.logger.error("[HTTP] Excepción con %s: %s", url, e)
+                # Registrar el error con un código de estado específico, por ejemplo, 0
+                self._record(url, 0)
+                return
 
-                    # ¿Ya visitamos esta URL?
-                    if current_url in self.visited:
-                        continue
+        # --- Si es HTML, parsear subenlaces ---
+        if is_html:
+            for link in self._new_links(html_bytes, url, _declared_charset(content_type)):
+                queue.put_nowait(link)
 
-                    # Marcar como visitada
-                    self.visited.add(current_url)
+    async def _worker(self, session, queue):
+        """
+        Tarea asíncrona que consume URLs de la cola indefinidamente.
+        """
+        while True:
+            url = await queue.get()
+            try:
+                await self._fetch(session, queue, url)
+            except Exception as e:
+                self.logger.error("Error inesperado procesando %s: %s", url, e)
+            finally:
+                queue.task_done()
 
-                    # Enviar la tarea al thread pool
-                    f = executor.submit(self._visit_url, current_url)
-                    futures.append(f)
+    def _record(self, url: str, status_code: int):
+        """
+        Encola el resultado (URL, código de estado) para el hilo escritor del CSV.
+        """
+        self.results.put((url, status_code))
 
-                # Si no hubo nada que procesar, salimos del bucle
-                if not futures:
-                    break
+    def _mark_if_new(self, url: str) -> bool:
+        """
+        Marca la URL como visitada de forma atómica. Devuelve False si ya lo estaba.
+        """
+        with self.visited_lock:
+            if url in self.visited:
+                return False
+            self.visited.add(url)
+            return True
 
-                # Esperar a que terminen todas las tareas en este lote
-                for _ in as_completed(futures):
-                    pass
+    def _next_pending(self):
+        """
+        Extrae la siguiente URL pendiente de self.queue, o None si está vacía.
+        """
+        with self.visited_lock:
+            return self.queue.popleft() if self.queue else None
 
-        tiempo_total = time.time() - inicio
-        self.logger.info(f"Rastreo completado en {tiempo_total:.2f} seg.")
-        self.logger.info(f"Total de URLs visitadas: {len(self.visited)}")
+    def _submit(self, url: str):
+        """
+        Envía la URL al thread pool, contabilizándola como tarea en curso.
+        No hace nada si el rastreo se está deteniendo.
+        """
+        with self.visited_lock:
+            if self.stopping:
+                return
+            self.inflight += 1
+            self.executor.submit(self._run_task, url)
 
-        # Guardar enlaces con sus códigos de estado si los hay
-        if self.all_links:
-            self._save_csv()
-            self.logger.info(f"Se registraron {len(self.all_links)} enlaces con sus códigos de estado.")
-            self.logger.info(f"Guardado en {self.csv_output}")
-        else:
-            self.logger.info("No se encontraron enlaces para registrar.")
+    def _run_task(self, url: str):
+        """
+        Ejecuta _visit_url y descuenta la tarea al terminar; la última tarea
+        en curso señala el fin del rastreo.
+        """
+        try:
+            self._visit_url(url)
+        except Exception as e:
+            self.logger.error("Error inesperado procesando %s: %s", url, e)
+        finally:
+            with self.visited_lock:
+                self.inflight -= 1
+                if self.inflight == 0:
+                    self.done.set()
 
-    def _save_csv(self):
+    def run(self):
         """
-        Guarda en CSV la lista de enlaces con sus códigos de estado.
-        El CSV se nombra como "<dominio>.csv".
+        Ejecuta el crawler, procesando hasta que no quede ninguna tarea en curso.
         """
+        self.log_listener.start()
         try:
-            with open(self.csv_output, "w", newline="", encoding="utf-8") as cfile:
+            self.logger.info("========== INICIANDO RASTREO ==========")
+            inicio = time.time()
+
+            self._resolve_base_domain()
+
+            # El CSV se abre antes de rastrear: si no se puede crear, no se rastrea
+            try:
+                cfile = open(self.csv_output, "w", newline="", encoding="utf-8", buffering=1 << 20)
+            except OSError as e:
+                self.logger.error("No se pudo crear %s: %s", self.csv_output, e)
+                raise
+
+            with cfile:
                 wr = csv.writer(cfile)
                 wr.writerow(["enlace", "codigo_estado"])
-                for link, status in self.all_links:
-                    wr.writerow([link, status])
-        except Exception as e:
-            self.logger.error(f"No se pudo guardar {self.csv_output}: {e}")
+                writer = threading.Thread(target=self._csv_writer, args=(wr,), name="csv-writer")
+                writer.start()
+
+                try:
+                    if self.use_async:
+                        asyncio.run(self._run_async())
+                    else:
+                        self._run_threaded()
+                finally:
+                    # Cerrar el hilo escritor una vez vaciada la cola de resultados
+                    self.results.put(None)
+                    writer.join()
+
+            tiempo_total = time.time() - inicio
+            self.logger.info("Rastreo completado en %.2f seg.", tiempo_total)
+            self.logger.info("Total de URLs visitadas: %d", len(self.visited))
+
+            if self.links_written:
+                self.logger.info("Se registraron %d enlaces con sus códigos de estado.", self.links_written)
+                self.logger.info("Guardado en %s", self.csv_output)
+            else:
+                # Como antes, no se deja un CSV con solo la cabecera
+                os.remove(self.csv_output)
+                self.logger.info("No se encontraron enlaces para registrar.")
+        finally:
+            # Vaciar los registros pendientes antes de terminar, también si
+            # el rastreo falla o se interrumpe (Ctrl+C)
+            self.log_listener.stop()
+            for handler in self.log_listener.handlers:
+                handler.close()
+
+    def _resolve_base_domain(self):
+        """
+        Resuelve por DNS el dominio base antes de empezar: detecta pronto un
+        dominio mal escrito y deja la resolución en la caché del sistema.
+        """
+        parsed = _urlparse_cached(self.start_url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            return
+        try:
+            infos = socket.getaddrinfo(
+                parsed.hostname, parsed.port or parsed.scheme, proto=socket.IPPROTO_TCP
+            )
+            addresses = sorted({info[4][0] for info in infos})
+            self.logger.info("DNS %s => %s", parsed.hostname, ", ".join(addresses))
+        except (socket.gaierror, ValueError) as e:
+            self.logger.warning("No se pudo resolver %s: %s", parsed.hostname, e)
+
+    def _run_threaded(self):
+        """
+        Rastreo con ThreadPoolExecutor y sesión de requests.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.executor = executor
+        try:
+            # Enviar las URLs iniciales; las demás las envían los propios workers
+            while True:
+                current_url = self._next_pending()
+                if current_url is None:
+                    break
+                if self._mark_if_new(current_url):
+                    self._submit(current_url)
+
+            # Esperar a que no quede ninguna tarea en curso
+            with self.visited_lock:
+                if self.inflight == 0:
+                    self.done.set()
+            self.done.wait()
+        except BaseException:
+            # Error o Ctrl+C: descartar las URLs en espera y esperar solo a las
+            # que ya se están procesando
+            with self.visited_lock:
+                self.stopping = True
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        executor.shutdown(wait=True)
+
+    async def _run_async(self):
+        """
+        Rastreo con asyncio y aiohttp: max_workers tareas consumiendo una cola.
+        """
+        queue = asyncio.Queue()
+        while True:
+            current_url = self._next_pending()
+            if current_url is None:
+                break
+            if self._mark_if_new(current_url):
+                queue.put_nowait(current_url)
+
+        connector = aiohttp.TCPConnector(
+            limit=self.max_workers,
+            limit_per_host=self.max_workers,
+            use_dns_cache=True,
+            ttl_dns_cache=300
+        )
+        timeout = aiohttp.ClientTimeout(sock_connect=TIMEOUT[0], sock_read=TIMEOUT[1])
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=timeout, headers=_DEFAULT_HEADERS
+        ) as session:
+            workers = [
+                asyncio.create_task(self._worker(session, queue))
+                for _ in range(self.max_workers)
+            ]
+            # Esperar a que la cola quede vacía y sin tareas en curso
+            await queue.join()
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def _csv_writer(self, wr):
+        """
+        Hilo escritor: vuelca al CSV (writer ya abierto por run()) cada
+        (URL, código) de self.results hasta recibir None. Si la escritura falla,
+        sigue vaciando la cola para no acumular resultados en memoria.
+        """
+        failed = False
+        while True:
+            item = self.results.get()
+            if item is None:
+                break
+            if failed:
+                continue
+            try:
+                wr.writerow(item)
+                self.links_written += 1
+            except Exception as e:
+                self.logger.error("No se pudo guardar %s: %s", self.csv_output, e)
+                failed = True
 
 
 def main():
@@ -284,12 +763,31 @@ def main():
         default=10,
         help="Número de hilos concurrentes."
     )
+    parser.add_argument(
+        "-a", "--async",
+        dest="use_async",
+        action="store_true",
+        help="Usar asyncio + aiohttp en lugar de hilos (requiere aiohttp)."
+    )
+    parser.add_argument(
+        "-b", "--bloom",
+        action="store_true",
+        help="Usar un filtro de Bloom para las URLs visitadas en rastreos muy grandes (requiere pybloom-live)."
+    )
+    parser.add_argument(
+        "-q", "--quiet",
+        action="store_true",
+        help="Modo silencioso: solo avisos y errores, escritos únicamente en crawler.log."
+    )
     args = parser.parse_args()
 
     crawler = Crawler(
         start_url=args.start_url,
         same_domain=args.same_domain,
-        max_workers=args.workers
+        max_workers=args.workers,
+        use_async=args.use_async,
+        use_bloom=args.bloom,
+        quiet=args.quiet
     )
     crawler.run()
 